@@ -1,12 +1,99 @@
-from flask import Flask, jsonify, request, render_template_string
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import JSONProvider
 import os
-import json
-from datetime import datetime
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, suppress
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from datetime import datetime, timedelta
+from statistics import fmean
 import requests
-import pandas as pd
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
+import orjson
+from typing import Dict, KeysView, List, Optional, Tuple
+from urllib.parse import urlencode
+
+try:
+    import fcntl
+except ImportError:  # Windows - meziprocesový zámek tokenu není k dispozici
+    fcntl = None
+
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider pro Flask postavený na orjson (rychlejší než stdlib json)"""
+    
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, option=self.option).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=self.option), mimetype='application/json')
+
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+# Doba platnosti cache freight dat (v sekundách)
+CACHE_TTL_SECONDS = 60
+
+# Filtr freight proposals je konstantní - serializujeme ho jednou při startu
+_FILTER_JSON = orjson.dumps({
+    "is_archived": False,
+    "proposal_request_status": "published"
+}).decode('utf-8')
+
+
+@lru_cache(maxsize=16)
+def _proposals_query(limit: int) -> str:
+    """Query string pro freight proposals - liší se jen limitem"""
+    return urlencode({
+        'sortBy': 'loading_date',
+        'order': 'ASC',
+        'limit': limit,
+        'filter': _FILTER_JSON
+    })
+
+
+# Soubor se sdíleným OAuth tokenem - workery na stejném stroji nemusí získávat vlastní token
+TOKEN_CACHE_PATH = os.getenv('TRANSEU_TOKEN_CACHE', os.path.join(tempfile.gettempdir(), 'transeu_token.json'))
+TOKEN_LOCK_PATH = f"{TOKEN_CACHE_PATH}.lock"
+
+
+@contextmanager
+def _shared_token_lock():
+    """Meziprocesový zámek pro obnovu tokenu - token obnovuje vždy jen jeden worker"""
+    if fcntl is None:
+        yield
+        return
+    
+    try:
+        fd = os.open(TOKEN_LOCK_PATH, os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+    except OSError as e:
+        print(f"Nepodařilo se otevřít zámek sdíleného tokenu: {e}")
+        yield
+        return
+    
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        # Zavřením deskriptoru se zámek uvolní
+        os.close(fd)
+
+# Sdílené prázdné výchozí hodnoty pro .get() při extrakci (nikdy se nemodifikují)
+_EMPTY: Dict = {}
+_NO_SPOTS: Tuple = ()
 
 # HTML template pro základní UI
 HTML_TEMPLATE = """
@@ -148,6 +235,43 @@ HTML_TEMPLATE = """
 </html>
 """
 
+# UI nemá žádné proměnné - stránku zakódujeme jednou při startu místo renderování při každém requestu
+_INDEX_HTML = HTML_TEMPLATE.encode('utf-8')
+_INDEX_ETAG = hashlib.sha1(_INDEX_HTML).hexdigest()
+
+@dataclass(slots=True)
+class FreightRecord:
+    """Klíčová data jedné freight nabídky"""
+    freight_id: Optional[int]
+    status: Optional[str]
+    price: float
+    currency: str
+    capacity: float
+    capacity_unit: str
+    loading_country: str
+    loading_city: str
+    unloading_country: str
+    unloading_city: str
+    route: str
+    distance_km: float
+
+
+@dataclass(slots=True)
+class FreightBatch:
+    """Dávka extrahovaných nabídek se souhrny spočítanými při extrakci"""
+    records: List[FreightRecord] = field(default_factory=list)
+    by_route: Dict[str, List[FreightRecord]] = field(default_factory=lambda: defaultdict(list))
+    total_price: float = 0
+    
+    @property
+    def count(self) -> int:
+        return len(self.records)
+    
+    @property
+    def unique_routes(self) -> KeysView[str]:
+        return self.by_route.keys()
+
+
 class TransEuAPIClient:
     """Trans.eu API Client pro Flask aplikaci"""
     
@@ -159,186 +283,347 @@ class TransEuAPIClient:
         self.base_url = "https://api.platform.trans.eu"
         self.access_token = None
         self.token_expires_at = None
+        self._headers: Optional[Dict[str, str]] = None
+        self._token_lock = threading.Lock()
+        
+        # Sdílená session - keep-alive spojení a retry pro Trans.eu API
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        ))
+        self.session.headers.update({'Accept': 'application/json'})
+        
+        # In-process TTL cache extrahovaných dat podle limitu
+        self._freight_cache: Dict[int, Tuple[float, FreightBatch]] = {}
+        self._freight_cache_locks: Dict[int, threading.Lock] = {}
+        
+        # Výsledek analýzy svázaný s konkrétní dávkou dat z cache
+        self._analysis_cache: Dict[int, Tuple[FreightBatch, List[Dict]]] = {}
+        self._analysis_lock = threading.Lock()
         
     def is_configured(self) -> bool:
         """Kontrola, zda jsou nastaveny potřebné credentials"""
         return all([self.api_key, self.client_id, self.client_secret])
     
+    def _has_valid_token(self) -> bool:
+        """Kontrola, zda je aktuální token stále platný"""
+        return bool(self.access_token and self.token_expires_at and datetime.now() < self.token_expires_at)
+    
     def get_access_token(self) -> str:
         """Získání OAuth2 access tokenu"""
-        if self.access_token and self.token_expires_at and datetime.now() < self.token_expires_at:
+        if self._has_valid_token():
             return self.access_token
-            
-        auth_url = f"{self.base_url}/oauth/v2/token"
-        
-        data = {
-            'grant_type': 'client_credentials',
-            'client_id': self.client_id,
-            'client_secret': self.client_secret
-        }
-        
-        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
         
-        response = requests.post(auth_url, data=data, headers=headers)
-        response.raise_for_status()
-        
-        token_data = response.json()
-        self.access_token = token_data['access_token']
-        
-        # Nastavení času expirace
-        expires_in = token_data.get('expires_in', 3600)
-        from datetime import timedelta
-        self.token_expires_at = datetime.now() + timedelta(seconds=expires_in - 60)
-        
-        return self.access_token
+        # Token obnovuje jen jeden thread, ostatní použijí jeho výsledek
+        with self._token_lock:
+            if self._has_valid_token() or self._load_shared_token():
+                return self.access_token
+            
+            # Mezi workery drží zámek jen jeden - ostatní po jeho uvolnění načtou nový token ze souboru
+            with _shared_token_lock():
+                if self._load_shared_token():
+                    return self.access_token
+                
+                auth_url = f"{self.base_url}/oauth/v2/token"
+                
+                data = {
+                    'grant_type': 'client_credentials',
+                    'client_id': self.client_id,
+                    'client_secret': self.client_secret
+                }
+                
+                headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+                
+                response = self.session.post(auth_url, data=data, headers=headers)
+                response.raise_for_status()
+                
+                token_data = orjson.loads(response.content)
+                
+                # Nastavení času expirace
+                expires_in = token_data.get('expires_in', 3600)
+                self._set_token(token_data['access_token'], datetime.now() + timedelta(seconds=expires_in - 60))
+                self._store_shared_token()
+                
+                return self.access_token
     
-    def get_headers(self) -> Dict[str, str]:
-        """Vytvoření headers pro API requesty"""
-        return {
-            'Accept': 'application/json',
+    def _set_token(self, access_token: str, expires_at: datetime) -> None:
+        """Nastavení nového tokenu a headers pro API requesty"""
+        # Headers se sestaví jen při změně tokenu, ne při každém requestu
+        self._headers = {
             'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.get_access_token()}',
+            'Authorization': f'Bearer {access_token}',
             'Api-key': self.api_key
         }
+        self.token_expires_at = expires_at
+        self.access_token = access_token
+    
+    def _load_shared_token(self) -> bool:
+        """Načtení platného tokenu, který uložil jiný worker"""
+        try:
+            with open(TOKEN_CACHE_PATH, 'rb') as f:
+                # Soubor ve sdíleném temp adresáři musí patřit nám
+                if hasattr(os, 'getuid') and os.fstat(f.fileno()).st_uid != os.getuid():
+                    return False
+                cached = orjson.loads(f.read())
+            
+            if cached['client_id'] != self.client_id:
+                return False
+            
+            expires_at = datetime.fromtimestamp(cached['expires_at'])
+            if datetime.now() >= expires_at:
+                return False
+            
+            self._set_token(cached['access_token'], expires_at)
+            return True
+            
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+    
+    def _store_shared_token(self) -> None:
+        """Uložení tokenu pro ostatní workery (atomicky přes přejmenování souboru)"""
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(TOKEN_CACHE_PATH) or '.')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps({
+                    'client_id': self.client_id,
+                    'access_token': self.access_token,
+                    'expires_at': self.token_expires_at.timestamp()
+                }))
+            os.replace(tmp_path, TOKEN_CACHE_PATH)
+            
+        except OSError as e:
+            print(f"Nepodařilo se uložit sdílený token: {e}")
+            if tmp_path:
+                with suppress(OSError):
+                    os.unlink(tmp_path)
+    
+    def get_headers(self) -> Dict[str, str]:
+        """Headers pro API requesty (sdílený slovník, neměnit)"""
+        if not self._has_valid_token():
+            self.get_access_token()
+        return self._headers
     
     def get_freight_proposals(self, limit: int = 50) -> List[Dict]:
         """Získání freight proposals"""
         endpoint = "/ext/freights-api/v1/freight-proposals"
-        url = f"{self.base_url}{endpoint}"
-        
-        params = {
-            'sortBy': 'loading_date',
-            'order': 'ASC',
-            'limit': limit,
-            'filter': json.dumps({
-                "is_archived": False,
-                "proposal_request_status": "published"
-            })
-        }
+        url = f"{self.base_url}{endpoint}?{_proposals_query(limit)}"
         
-        response = requests.get(url, headers=self.get_headers(), params=params)
+        response = self.session.get(url, headers=self.get_headers())
         response.raise_for_status()
         
-        data = response.json()
+        data = orjson.loads(response.content)
         return data if isinstance(data, list) else []
     
-    def extract_freight_data(self, proposals: List[Dict]) -> List[Dict]:
+    def extract_freight_data(self, proposals: List[Dict]) -> FreightBatch:
         """Extrakce klíčových dat z freight proposals"""
-        freight_data = []
+        batch = FreightBatch()
+        append = batch.records.append
+        by_route = batch.by_route
+        total_price = 0
+        
+        # Kódy zemí a tras podle dvojice zemí - převod na velká písmena jen jednou na dvojici
+        route_codes: Dict[Tuple[str, str], Tuple[str, str, str]] = {}
         
         for proposal in proposals:
+            freight = _EMPTY
             try:
-                freight = proposal.get('freight', {})
+                freight = proposal.get('freight', _EMPTY)
                 
-                # Základní informace
-                freight_id = freight.get('id')
-                status = proposal.get('status')
+                # Informace o trasách - nabídky bez nakládky a vykládky rovnou přeskočíme
+                spots = freight.get('spots', _NO_SPOTS)
+                if len(spots) < 2:
+                    continue
                 
                 # Cenové informace
-                publication = freight.get('publication', {})
-                price_info = publication.get('price', {})
-                price = price_info.get('value', 0)
-                currency = price_info.get('currency', 'EUR')
+                price_info = freight.get('publication', _EMPTY).get('price', _EMPTY)
                 
                 # Informace o kapacitě
-                capacity_info = freight.get('capacity', {})
-                capacity = capacity_info.get('value', 0)
-                capacity_unit = capacity_info.get('unit_code', 't')
+                capacity_info = freight.get('capacity', _EMPTY)
+                
+                # Nakládka a vykládka
+                loading_address = spots[0].get('place', _EMPTY).get('address', _EMPTY)
+                unloading_address = spots[-1].get('place', _EMPTY).get('address', _EMPTY)
+                
+                countries = (loading_address.get('country', ''), unloading_address.get('country', ''))
+                codes = route_codes.get(countries)
+                if codes is None:
+                    loading_country = countries[0].upper()
+                    unloading_country = countries[1].upper()
+                    codes = route_codes[countries] = (loading_country, unloading_country, f"{loading_country}-{unloading_country}")
+                loading_country, unloading_country, route = codes
+                
+                # Chybějící i null cena se počítá jako 0 (záznam se neztratí)
+                price = price_info.get('value') or 0
+                
+                # Souhrny ve stejném průchodu
+                total_price += price
+                
+                # Poziční argumenty v pořadí polí FreightRecord (rychlejší než keyword volání)
+                record = FreightRecord(
+                    freight.get('id'),
+                    proposal.get('status'),
+                    price,
+                    price_info.get('currency', 'EUR'),
+                    capacity_info.get('value', 0),
+                    capacity_info.get('unit_code', 't'),
+                    loading_country,
+                    loading_address.get('locality', ''),
+                    unloading_country,
+                    unloading_address.get('locality', ''),
+                    route,
+                    freight.get('distance', 0)
+                )
+                append(record)
+                
+                # Index podle tras - unikátní trasy jsou jeho klíče
+                by_route[route].append(record)
                 
-                # Informace o trasách
-                spots = freight.get('spots', [])
-                if len(spots) >= 2:
-                    # Nakládka
-                    loading_spot = spots[0]
-                    loading_address = loading_spot.get('place', {}).get('address', {})
-                    loading_country = loading_address.get('country', '').upper()
-                    loading_city = loading_address.get('locality', '')
-                    
-                    # Vykládka
-                    unloading_spot = spots[-1]
-                    unloading_address = unloading_spot.get('place', {}).get('address', {})
-                    unloading_country = unloading_address.get('country', '').upper()
-                    unloading_city = unloading_address.get('locality', '')
-                    
-                    freight_record = {
-                        'freight_id': freight_id,
-                        'status': status,
-                        'price': price,
-                        'currency': currency,
-                        'capacity': capacity,
-                        'capacity_unit': capacity_unit,
-                        'loading_country': loading_country,
-                        'loading_city': loading_city,
-                        'unloading_country': unloading_country,
-                        'unloading_city': unloading_city,
-                        'route': f"{loading_country}-{unloading_country}",
-                        'distance_km': freight.get('distance', 0)
-                    }
-                    
-                    freight_data.append(freight_record)
-                    
             except Exception as e:
                 print(f"Chyba při zpracování freight {freight.get('id', 'unknown')}: {e}")
                 continue
         
-        return freight_data
+        batch.total_price = total_price
+        return batch
     
-    def detect_arbitrage_opportunities(self, freight_data: List[Dict]) -> List[Dict]:
+    def get_freight_data(self, limit: int = 50) -> FreightBatch:
+        """Získání extrahovaných freight dat s TTL cache podle limitu"""
+        # Platná data vracíme bez zámku
+        cached = self._freight_cache.get(limit)
+        if cached and time.monotonic() < cached[0]:
+            return cached[1]
+        
+        # Zámek pro daný limit drží i stahování, aby souběžné requesty nestahovaly stejná data;
+        # ostatní limity na stahování nečekají (dict.setdefault je atomický)
+        lock = self._freight_cache_locks.setdefault(limit, threading.Lock())
+        with lock:
+            cached = self._freight_cache.get(limit)
+            if cached and time.monotonic() < cached[0]:
+                return cached[1]
+            
+            proposals = self.get_freight_proposals(limit=limit)
+            batch = self.extract_freight_data(proposals)
+            self._freight_cache[limit] = (time.monotonic() + CACHE_TTL_SECONDS, batch)
+            
+            return batch
+    
+    def get_arbitrage_opportunities(self, limit: int = 200) -> Tuple[FreightBatch, List[Dict]]:
+        """Získání freight dat a arbitrážních příležitostí, analýza se počítá jednou na dávku dat"""
+        batch = self.get_freight_data(limit=limit)
+        
+        with self._analysis_lock:
+            cached = self._analysis_cache.get(limit)
+            if cached and cached[0] is batch:
+                return batch, cached[1]
+            
+            opportunities = self.detect_arbitrage_opportunities(batch)
+            self._analysis_cache[limit] = (batch, opportunities)
+            
+            return batch, opportunities
+    
+    def detect_arbitrage_opportunities(self, batch: FreightBatch) -> List[Dict]:
         """Detekce arbitrážních příležitostí"""
-        if not freight_data:
+        if not batch.records:
             return []
         
-        df = pd.DataFrame(freight_data)
-        
-        # Analýza podle tras
-        route_analysis = df.groupby('route').agg({
-            'price': ['mean', 'min', 'max', 'count']
-        }).round(2)
-        
-        route_analysis.columns = ['price_mean', 'price_min', 'price_max', 'price_count']
-        route_analysis.reset_index(inplace=True)
+        # Ceny seřazené podle indexu tras - skupiny jsou dané už indexem, netřeba np.unique
+        routes = np.array(list(batch.by_route))
+        group_sizes = [len(records) for records in batch.by_route.values()]
+        n_routes = len(routes)
+        route_idx = np.repeat(np.arange(n_routes), group_sizes)
+        prices = np.fromiter(
+            (f.price for records in batch.by_route.values() for f in records),
+            dtype=np.float64, count=batch.count
+        )
+        
+        # Analýza podle tras - jeden průchod polem cen pro každou statistiku
+        price_count = np.bincount(route_idx, minlength=n_routes)
+        price_sum = np.bincount(route_idx, weights=prices, minlength=n_routes)
+        price_min = np.full(n_routes, np.inf)
+        np.minimum.at(price_min, route_idx, prices)
+        price_max = np.full(n_routes, -np.inf)
+        np.maximum.at(price_max, route_idx, prices)
+        
+        price_mean = np.round(price_sum / price_count, 2)
+        price_min = np.round(price_min, 2)
+        price_max = np.round(price_max, 2)
         
         # Výpočet volatility
-        route_analysis['price_volatility'] = (
-            (route_analysis['price_max'] - route_analysis['price_min']) / 
-            route_analysis['price_mean'].replace(0, 1)
-        ).round(3)
-        
-        # Filtrace tras s vysokou volatilitou
-        arbitrage_routes = route_analysis[
-            (route_analysis['price_volatility'] > 0.2) & 
-            (route_analysis['price_count'] >= 2)
-        ].sort_values('price_volatility', ascending=False)
-        
-        return arbitrage_routes.to_dict('records')
+        price_volatility = np.round(
+            (price_max - price_min) / np.where(price_mean == 0, 1, price_mean), 3
+        )
+        
+        # Filtrace tras s vysokou volatilitou, seřazeno sestupně podle volatility (shody podle trasy)
+        selected = np.flatnonzero((price_volatility > 0.2) & (price_count >= 2))
+        selected = selected[np.lexsort((routes[selected], -price_volatility[selected]))]
+        
+        return [
+            {
+                'route': route,
+                'price_mean': mean,
+                'price_min': low,
+                'price_max': high,
+                'price_count': count,
+                'price_volatility': volatility
+            }
+            for route, mean, low, high, count, volatility in zip(
+                routes[selected].tolist(),
+                price_mean[selected].tolist(),
+                price_min[selected].tolist(),
+                price_max[selected].tolist(),
+                price_count[selected].tolist(),
+                price_volatility[selected].tolist()
+            )
+        ]
 
 
 # Inicializace API clienta
 api_client = TransEuAPIClient()
 
+# Statické JSON odpovědi zakódované jednou při startu
+_NOT_CONFIGURED_JSON = orjson.dumps({
+    'success': False,
+    'message': 'API credentials nejsou nastaveny'
+})
+_STATUS_NOT_CONFIGURED_JSON = orjson.dumps({
+    'success': False,
+    'message': 'API credentials nejsou nastaveny. Zkontrolujte environment variables.',
+    'required_vars': ['TRANSEU_API_KEY', 'TRANSEU_CLIENT_ID', 'TRANSEU_CLIENT_SECRET']
+})
+
+# Health check se liší jen časem - statickou část objektu připravíme předem
+_HEALTH_JSON_PREFIX = orjson.dumps({
+    'status': 'healthy',
+    'service': 'Trans.eu Arbitrage Detector'
+})[:-1] + b',"timestamp":'
+
+
+def _json_response(body: bytes) -> Response:
+    """Odpověď z již zakódovaného JSON"""
+    return app.response_class(body, mimetype='application/json')
+
+
 @app.route('/api/freights')
 def get_freights():
     """Získání freight proposals"""
     try:
         if not api_client.is_configured():
-            return jsonify({
-                'success': False,
-                'message': 'API credentials nejsou nastaveny'
-            })
+            return _json_response(_NOT_CONFIGURED_JSON)
         
-        # Získání dat
-        proposals = api_client.get_freight_proposals(limit=100)
-        freight_data = api_client.extract_freight_data(proposals)
+        # Získání dat (souhrny jsou spočítané už při extrakci)
+        batch = api_client.get_freight_data(limit=100)
         
         return jsonify({
             'success': True,
-            'message': f'Získáno {len(freight_data)} nabídek',
-            'freights': freight_data[:20],  # Omezení pro rychlost
-            'total_count': len(freight_data),
+            'message': f'Získáno {batch.count} nabídek',
+            'freights': batch.records[:20],  # Omezení pro rychlost
+            'total_count': batch.count,
             'summary': {
-                'Celkem nabídek': len(freight_data),
-                'Unikátních tras': len(set(f['route'] for f in freight_data)),
-                'Průměrná cena': round(sum(f['price'] for f in freight_data) / len(freight_data), 2) if freight_data else 0
+                'Celkem nabídek': batch.count,
+                'Unikátních tras': len(batch.unique_routes),
+                'Průměrná cena': round(batch.total_price / batch.count, 2) if batch.count else 0
             }
         })
         
@@ -353,35 +638,28 @@ def analyze_arbitrage():
     """Spuštění analýzy arbitráže"""
     try:
         if not api_client.is_configured():
-            return jsonify({
-                'success': False,
-                'message': 'API credentials nejsou nastaveny'
-            })
+            return _json_response(_NOT_CONFIGURED_JSON)
         
-        # Získání dat
-        proposals = api_client.get_freight_proposals(limit=200)
-        freight_data = api_client.extract_freight_data(proposals)
+        # Získání dat a detekce arbitráže (výsledek je cachovaný s daty)
+        batch, arbitrage_opportunities = api_client.get_arbitrage_opportunities(limit=200)
         
-        if not freight_data:
+        if not batch.records:
             return jsonify({
                 'success': False,
                 'message': 'Nepodařilo se získat žádná data pro analýzu'
             })
         
-        # Detekce arbitráže
-        arbitrage_opportunities = api_client.detect_arbitrage_opportunities(freight_data)
-        
         return jsonify({
             'success': True,
             'message': f'Analýza dokončena. Nalezeno {len(arbitrage_opportunities)} arbitrážních příležitostí.',
             'summary': {
-                'Celkem nabídek': len(freight_data),
-                'Unikátních tras': len(set(f['route'] for f in freight_data)),
+                'Celkem nabídek': batch.count,
+                'Unikátních tras': len(batch.unique_routes),
                 'Arbitrážních příležitostí': len(arbitrage_opportunities),
-                'Průměrná volatilita': round(sum(opp['price_volatility'] for opp in arbitrage_opportunities) / len(arbitrage_opportunities), 3) if arbitrage_opportunities else 0
+                'Průměrná volatilita': round(fmean(opp['price_volatility'] for opp in arbitrage_opportunities), 3) if arbitrage_opportunities else 0
             },
             'arbitrage_opportunities': arbitrage_opportunities[:10],  # Top 10
-            'freights': freight_data[:10]  # Ukázka dat
+            'freights': batch.records[:10]  # Ukázka dat
         })
         
     except Exception as e:
@@ -395,17 +673,13 @@ def get_route_details(route_code):
     """Detail konkrétní trasy"""
     try:
         if not api_client.is_configured():
-            return jsonify({
-                'success': False,
-                'message': 'API credentials nejsou nastaveny'
-            })
+            return _json_response(_NOT_CONFIGURED_JSON)
         
         # Získání dat
-        proposals = api_client.get_freight_proposals(limit=500)
-        freight_data = api_client.extract_freight_data(proposals)
+        batch = api_client.get_freight_data(limit=500)
         
-        # Filtrace podle trasy
-        route_freights = [f for f in freight_data if f['route'] == route_code.upper()]
+        # Nabídky trasy z indexu podle tras
+        route_freights = batch.by_route.get(route_code.upper(), [])
         
         if not route_freights:
             return jsonify({
@@ -413,8 +687,11 @@ def get_route_details(route_code):
                 'message': f'Nenalezeny žádné nabídky pro trasu {route_code}'
             })
         
-        # Statistiky trasy
-        prices = [f['price'] for f in route_freights]
+        # Statistiky trasy - ceny zůstávají původního typu (int zůstane int), průměr přes fmean
+        prices = [f.price for f in route_freights]
+        min_price = min(prices)
+        max_price = max(prices)
+        avg_price = fmean(prices)
         
         return jsonify({
             'success': True,
@@ -422,11 +699,11 @@ def get_route_details(route_code):
             'freights': route_freights,
             'statistics': {
                 'count': len(route_freights),
-                'min_price': min(prices),
-                'max_price': max(prices),
-                'avg_price': round(sum(prices) / len(prices), 2),
-                'price_spread': max(prices) - min(prices),
-                'volatility': round((max(prices) - min(prices)) / (sum(prices) / len(prices)), 3)
+                'min_price': min_price,
+                'max_price': max_price,
+                'avg_price': round(avg_price, 2),
+                'price_spread': max_price - min_price,
+                'volatility': round((max_price - min_price) / avg_price, 3)
             }
         })
         
@@ -439,29 +716,23 @@ def get_route_details(route_code):
 @app.route('/health')
 def health_check():
     """Health check pro Railway"""
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'service': 'Trans.eu Arbitrage Detector'
-    })
+    return _json_response(_HEALTH_JSON_PREFIX + orjson.dumps(datetime.now().isoformat()) + b'}')
 
-if __name__ == '__main__':
-    port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)app.route('/')
+@app.route('/')
 def index():
     """Hlavní stránka s UI"""
-    return render_template_string(HTML_TEMPLATE)
+    response = Response(_INDEX_HTML, mimetype='text/html')
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    response.set_etag(_INDEX_ETAG)
+    return response.make_conditional(request)
 
 @app.route('/api/status')
 def api_status():
     """Kontrola stavu API"""
     try:
         if not api_client.is_configured():
-            return jsonify({
-                'success': False,
-                'message': 'API credentials nejsou nastaveny. Zkontrolujte environment variables.',
-                'required_vars': ['TRANSEU_API_KEY', 'TRANSEU_CLIENT_ID', 'TRANSEU_CLIENT_SECRET']
-            })
+            return _json_response(_STATUS_NOT_CONFIGURED_JSON)
         
         # Test API připojení
         token = api_client.get_access_token()
@@ -479,4 +750,6 @@ def api_status():
             'message': f'Chyba API: {str(e)}'
         })
 
-@
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=False)